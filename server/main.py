@@ -1,29 +1,32 @@
 #!/usr/bin/env python3
 
-import argparse
 import logging
+from typing import List, Optional
+from rgrr.cli import build_parser
 from rgrr.logging_config import setup_logging
 
 from rgrr.model import Model
 import rgrr.simulator as sim
 from rgrr.operations import (
     ResourceDistributionOperation,
+    PreferentialResourceDistribution,
     IncomeTaxCollectionOperation,
-    RequiredExpenditureOperation
+    RequiredExpenditureOperation,
+    SimulatorOperation
 )
 from rgrr.simulation_store import store_simulation, get_simulation
 
-def run_simulation_from_args(args) -> sim.MultiStepSimulator:
+def build_simulator_from_args(args, seed: Optional[int]) -> sim.MultiStepSimulator:
     # Create the simulation model with initial resources
     m = Model(args.nodes, args.resources)
 
-    operations = []
+    operations: List[SimulatorOperation] = []
     expenditure_distribution_method = 'uniform' # Default
     if args.random_method:
         operations.append(ResourceDistributionOperation.create('random', args.random_method))
         expenditure_distribution_method = 'random'
     if args.preferential_method:
-        operations.append(ResourceDistributionOperation.create('preferential', args.preferential_method))
+        operations.append(PreferentialResourceDistribution(args.preferential_method, args.preferential_batch_size))
         expenditure_distribution_method = 'preferential'
     if args.uniform_method:
         operations.append(ResourceDistributionOperation.create('uniform', args.uniform_method))
@@ -36,104 +39,31 @@ def run_simulation_from_args(args) -> sim.MultiStepSimulator:
     logging.debug(f"Created model with {args.nodes} nodes, each starting with {args.resources} resources")
     logging.debug(f"Initial total resources: {m.total_resources}")
 
-    # Create and run the multi-step simulation
-    multi_step_simulator = sim.MultiStepSimulator(m, args.epochs, args.seed, operations, expenditure_distribution_method)
-    multi_step_simulator.run()
-    return multi_step_simulator
+    return sim.MultiStepSimulator(m, args.epochs, seed, operations, expenditure_distribution_method)
 
-def main():
-    # Set up logging
-    setup_logging()
-
-    # Set up command line argument parser
-    parser = argparse.ArgumentParser(
-        description='Simulate preferential resource distribution',
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter
-    )
-
-    # Model specification
-    parser.add_argument(
-        '-n', '--nodes',
-        type=int,
-        default=100,
-        help='Number of nodes'
-    )
-
-    parser.add_argument(
-        '-r', '--resources',
-        type=int,
-        default=100,
-        help='Initial number of resources per node'
-    )
-
-    # Non-operation simulator specification
-    parser.add_argument(
-        '-s', '--seed',
-        type=int,
-        default=None,
-        help='Random seed for reproducibility'
-    )
-
-    parser.add_argument(
-        '--epochs',
-        type=int,
-        default=1,
-        help='Number of epochs to run the simulation'
-    )
-
-    group = parser.add_mutually_exclusive_group()
-    group.add_argument(
-        '--plot-histogram',
-        action='store_true',
-        help='Plot a histogram of resource counts after simulation'
-    )
-    group.add_argument(
-        '--start-http-server',
-        action='store_true',
-        help='Start an HTTP server to retrieve distributions'
-    )
-
-    # Operation specifications
-    dist_group = parser.add_mutually_exclusive_group()
-    dist_group.add_argument(
-        '--random-method',
-        type=int,
-        default=0,
-        help='Use random method for adding resources'
-    )
-
-    dist_group.add_argument(
-        '--preferential-method',
-        type=int,
-        default=0,
-        help='Use preferential method for adding resources'
-    )
-
-    dist_group.add_argument(
-        '--uniform-method',
-        type=int,
-        default=0,
-        help='Use uniform method for adding resources'
-    )
-
-    parser.add_argument(
-        '--income-tax-rate',
-        type=float,
-        default=0.0,
-        help='Income tax rate to apply at the end of the simulation'
-    )
-
-    parser.add_argument(
-        '--required-expenditure',
-        type=int,
-        default=0,
-        help='Required expenditure to apply at the end of the simulation'
-    )
+def run_simulations_from_args(args) -> List[sim.MultiStepSimulator]:
+    """Run the simulation, or independent runs of it seeded from args.seed."""
+    if args.runs == 1:
+        multi_step_simulator = build_simulator_from_args(args, args.seed)
+        multi_step_simulator.run()
+        return [multi_step_simulator]
+    seeds = sim.spawn_seeds(args.seed, args.runs)
+    simulators = sim.run_independent([build_simulator_from_args(args, seed) for seed in seeds])
+    for run, simulator in enumerate(simulators, start=1):
+        logging.info(f"Run {run} (seed {simulator.seed}): final total resources {simulator.model.total_resources}")
+    return simulators
 
+def main():
     # Parse arguments
-    args = parser.parse_args()
-    simulator = run_simulation_from_args(args)
-    store_simulation("dummy", simulator)
+    args = build_parser().parse_args()
+
+    # Set up logging
+    setup_logging(logging.INFO if args.quiet else logging.DEBUG)
+    simulators = run_simulations_from_args(args)
+    # The first run is the one plotted; the server also serves the others
+    store_simulation("dummy", simulators[0])
+    for run, simulator in enumerate(simulators[1:], start=2):
+        store_simulation(f"run-{run}", simulator)
     if args.plot_histogram:
         from rgrr.plotting import EpochPlotter
         plotter = EpochPlotter()
@@ -141,7 +71,7 @@ def main():
 
     if args.start_http_server:
         from rgrr.server import app
-        from flask_swagger_ui import get_swaggerui_blueprint
+        from flask_swagger_ui import get_swaggerui_blueprint  # type: ignore[import-untyped]
 
         SWAGGER_URL = '/api/docs'  # URL for exposing Swagger UI (without trailing '/')
         API_URL = '/swagger.json'  # Our API url (can of course be a local resource)
@@ -0,0 +1,40 @@
+"""Compile the kernels in rgrr._kernels ahead of time.
+
+Run `python -m rgrr._build_aot` with numba installed to write the
+rgrr/_aot_kernels extension module next to this file. Once built, the
+kernels load as native code at import, with no JIT compile on first use and
+no numba needed at run time. Rebuild after changing rgrr/_kernels.py.
+"""
+import os
+import sys
+
+
+# The kernel signatures, fixed to the int64 arrays the simulator uses
+SIGNATURES = {
+    'fenwick_build': 'void(i8[:])',
+    'fenwick_add': 'void(i8[:], i8, i8)',
+    'fenwick_prefix_sum': 'i8(i8[:], i8)',
+    'fenwick_find_kth': 'i8(i8[:], i8, i8)',
+    'preferential_draw': 'void(i8[:], i8, i8[:], i8[:], i8[:])',
+    'alias_build': 'void(i8[:], f8[:], i8[:])',
+    'histogram_counts': 'void(i8[:, :], f8[:], i8[:, :])',
+}
+
+
+def build():
+    """Compile the kernels into rgrr/_aot_kernels."""
+    # Compile from the numba kernels, not from a previous build
+    sys.modules['rgrr._aot_kernels'] = None  # type: ignore[assignment]
+    from numba.pycc import CC
+
+    from rgrr import _kernels
+
+    cc = CC('_aot_kernels')
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    for name, signature in SIGNATURES.items():
+        cc.export(name, signature)(getattr(_kernels, name).py_func)
+    cc.compile()
+
+
+if __name__ == '__main__':
+    build()
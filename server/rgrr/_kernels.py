@@ -0,0 +1,187 @@
+"""Compiled kernels for the simulator's hot loops.
+
+The kernels are compiled with numba when it is installed. Without numba they
+run as ordinary Python functions and produce the same results, only slower.
+If the ahead-of-time build from `python -m rgrr._build_aot` is present, its
+kernels are used instead, which needs no JIT warmup and no numba at run time.
+"""
+from typing import List, Union
+
+import numpy as np
+
+# Fenwick tree storage: an int64 array, or a list of ints when uncompiled
+IntBuffer = Union[np.ndarray, List[int]]
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - exercised only without numba
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):  # type: ignore[no-redef]
+        """Stand-in for numba.njit that leaves the function uncompiled."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Whether the kernels run natively and expect int64 arrays
+COMPILED = HAVE_NUMBA
+
+
+@njit(cache=True)
+def fenwick_build(tree: IntBuffer):
+    """Turn an array of values at indices 1..n into a Fenwick tree in O(n)."""
+    size = len(tree)
+    for i in range(1, size):
+        j = i + (i & (-i))
+        if j < size:
+            tree[j] += tree[i]
+
+
+@njit(cache=True)
+def fenwick_add(tree: IntBuffer, i: int, delta: int):
+    """Add delta to element i of a Fenwick tree."""
+    size = len(tree)
+    i += 1  # 1-based index
+    while i < size:
+        tree[i] += delta
+        i += i & (-i)
+
+
+@njit(cache=True)
+def fenwick_prefix_sum(tree: IntBuffer, i: int) -> int:
+    """Compute the prefix sum of a Fenwick tree up to element i."""
+    i += 1  # 1-based index
+    s = 0
+    while i > 0:
+        s += tree[i]
+        i -= i & (-i)
+    return s
+
+
+@njit(cache=True)
+def fenwick_find_kth(tree: IntBuffer, k: int, highbit: int) -> int:
+    """Find the smallest index i such that the prefix sum up to i is >= k.
+
+    `highbit` is the largest power of two not greater than `len(tree) - 1`,
+    the number of elements.
+    """
+    size = len(tree)
+    i = 0
+    p = highbit
+    while p > 0:
+        if i + p < size and tree[i + p] < k:
+            k -= tree[i + p]
+            i += p
+        p >>= 1
+    return i
+
+
+@njit(cache=True)
+def preferential_draw(tree: IntBuffer, highbit: int, resources: np.ndarray,
+                      resources_added: np.ndarray, draws: np.ndarray):
+    """Add one resource per draw to the node holding that unit of weight.
+
+    Args:
+        tree: Fenwick tree array over `resources`, updated in place.
+        highbit: The largest power of two not greater than `len(tree) - 1`.
+        resources: Per-node resource counts, updated in place.
+        resources_added: Per-node added resource counts, updated in place.
+        draws: 1-based weight offsets, one per resource to add. Draw `d`
+            must lie within the total weight after the preceding draws.
+    """
+    for d in range(draws.size):
+        i = fenwick_find_kth(tree, draws[d], highbit)
+        resources[i] += 1
+        resources_added[i] += 1
+        fenwick_add(tree, i, 1)
+
+
+@njit(cache=True)
+def alias_build(weights: np.ndarray, cutoff: np.ndarray, alias: np.ndarray):
+    """Fill Walker alias tables for sampling indices in proportion to weights.
+
+    Uses Vose's O(n) construction. Sampling picks a uniform index `i`, then
+    keeps it with probability `cutoff[i]` and otherwise takes `alias[i]`.
+
+    Args:
+        weights: Non-negative weights with a positive sum.
+        cutoff: Float array of the same size, filled with keep probabilities.
+        alias: Int array of the same size, filled with alias indices.
+    """
+    n = weights.size
+    total = weights.sum()
+    small = np.empty(n, dtype=np.int64)
+    large = np.empty(n, dtype=np.int64)
+    n_small = 0
+    n_large = 0
+    for i in range(n):
+        cutoff[i] = weights[i] * n / total
+        alias[i] = i
+        if cutoff[i] < 1.0:
+            small[n_small] = i
+            n_small += 1
+        else:
+            large[n_large] = i
+            n_large += 1
+    while n_small > 0 and n_large > 0:
+        n_small -= 1
+        s = small[n_small]
+        g = large[n_large - 1]
+        alias[s] = g
+        cutoff[g] -= 1.0 - cutoff[s]
+        if cutoff[g] < 1.0:
+            n_large -= 1
+            small[n_small] = g
+            n_small += 1
+    # Whatever is left is only short of 1 through rounding error
+    for j in range(n_small):
+        cutoff[small[j]] = 1.0
+    for j in range(n_large):
+        cutoff[large[j]] = 1.0
+
+
+@njit(cache=True)
+def histogram_counts(values: np.ndarray, bin_edges: np.ndarray, counts: np.ndarray):
+    """Count each row of values into the evenly spaced bins of bin_edges.
+
+    Counts match np.histogram: values outside the edges are skipped, and the
+    last bin includes its right edge.
+
+    Args:
+        values: One row of values per histogram.
+        bin_edges: Evenly spaced, increasing bin edges.
+        counts: Int array of shape (rows, bins), incremented in place.
+    """
+    bin_count = bin_edges.size - 1
+    lo = bin_edges[0]
+    hi = bin_edges[bin_count]
+    scale = bin_count / (hi - lo)
+    for row in range(values.shape[0]):
+        for j in range(values.shape[1]):
+            value = values[row, j]
+            if value < lo or value > hi:
+                continue
+            b = min(int((value - lo) * scale), bin_count - 1)
+            # Step back over an edge that rounding carried the value past
+            if value < bin_edges[b]:
+                b -= 1
+            elif b < bin_count - 1 and value >= bin_edges[b + 1]:
+                b += 1
+            counts[row, b] += 1
+
+
+# The ahead-of-time kernels deliberately replace the definitions above
+try:
+    from rgrr._aot_kernels import (  # type: ignore[import-not-found, no-redef]  # noqa: F401,F811
+        alias_build,
+        fenwick_add,
+        fenwick_build,
+        fenwick_find_kth,
+        fenwick_prefix_sum,
+        histogram_counts,
+        preferential_draw,
+    )
+    COMPILED = True
+except ImportError:
+    pass
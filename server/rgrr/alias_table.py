@@ -0,0 +1,21 @@
+import numpy as np
+
+from rgrr._kernels import alias_build
+
+
+class AliasTable:
+    """Walker alias tables for drawing node indices in proportion to weights.
+
+    Building the tables is O(n); each draw is then O(1), and a batch of draws
+    is a few vectorized NumPy operations.
+    """
+    def __init__(self, weights: np.ndarray):
+        self.cutoff = np.empty(len(weights), dtype=np.float64)
+        self.alias = np.empty(len(weights), dtype=np.int64)
+        alias_build(weights, self.cutoff, self.alias)
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        """Draw size indices with probability proportional to their weight."""
+        picks = rng.integers(len(self.cutoff), size=size)
+        keep = rng.random(size) < self.cutoff[picks]
+        return np.where(keep, picks, self.alias[picks])
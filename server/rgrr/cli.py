@@ -0,0 +1,131 @@
+import argparse
+
+
+def batch_size(value: str):
+    """Parse a preferential batch size, which is a positive integer or 'auto'."""
+    if value == 'auto':
+        return value
+    size = int(value)
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"batch size must be positive or 'auto': {value}")
+    return size
+
+
+def positive_int(value: str) -> int:
+    """Parse a positive integer."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive: {value}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line argument parser for running a simulation."""
+    parser = argparse.ArgumentParser(
+        description='Simulate preferential resource distribution',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    # Model specification
+    parser.add_argument(
+        '-n', '--nodes',
+        type=int,
+        default=100,
+        help='Number of nodes'
+    )
+
+    parser.add_argument(
+        '-r', '--resources',
+        type=int,
+        default=100,
+        help='Initial number of resources per node'
+    )
+
+    # Non-operation simulator specification
+    parser.add_argument(
+        '-s', '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducibility'
+    )
+
+    parser.add_argument(
+        '--epochs',
+        type=int,
+        default=1,
+        help='Number of epochs to run the simulation'
+    )
+
+    parser.add_argument(
+        '--runs',
+        type=positive_int,
+        default=1,
+        help='Number of independent runs, in parallel processes; with several, '
+             'each run is seeded from --seed'
+    )
+
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help='Skip the per-epoch progress and summary logs'
+    )
+
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        '--plot-histogram',
+        action='store_true',
+        help='Plot a histogram of resource counts after simulation'
+    )
+    group.add_argument(
+        '--start-http-server',
+        action='store_true',
+        help='Start an HTTP server to retrieve distributions'
+    )
+
+    # Operation specifications
+    dist_group = parser.add_mutually_exclusive_group()
+    dist_group.add_argument(
+        '--random-method',
+        type=int,
+        default=0,
+        help='Use random method for adding resources'
+    )
+
+    dist_group.add_argument(
+        '--preferential-method',
+        type=int,
+        default=0,
+        help='Use preferential method for adding resources'
+    )
+
+    dist_group.add_argument(
+        '--uniform-method',
+        type=int,
+        default=0,
+        help='Use uniform method for adding resources'
+    )
+
+    parser.add_argument(
+        '--preferential-batch-size',
+        type=batch_size,
+        default=None,
+        help="Draw preferential resources in batches of this size, using the weights at the start of each batch; "
+             "faster than drawing one at a time only for batches of at least about the number of nodes. "
+             "'auto' picks the square root of the resources added, but at least the number of nodes"
+    )
+
+    parser.add_argument(
+        '--income-tax-rate',
+        type=float,
+        default=0.0,
+        help='Income tax rate to apply at the end of the simulation'
+    )
+
+    parser.add_argument(
+        '--required-expenditure',
+        type=int,
+        default=0,
+        help='Required expenditure to apply at the end of the simulation'
+    )
+
+    return parser
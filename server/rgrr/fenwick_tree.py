@@ -1,5 +1,14 @@
 import numpy as np
 
+from rgrr._kernels import (
+    COMPILED,
+    IntBuffer,
+    fenwick_add,
+    fenwick_build,
+    fenwick_find_kth,
+    fenwick_prefix_sum,
+)
+
 # This class is only used in preferential distribution operation.
 # It might be better to restrict its use to that one class, but
 # it isn't clear if that's the right approach.
@@ -7,31 +16,45 @@ import numpy as np
 class FenwickTree:
     """A Fenwick Tree (or Binary Indexed Tree) for efficient prefix sum calculations."""
     def __init__(self, size: int):
-        self.tree = np.zeros(size + 1, dtype=np.int64)
+        # Uncompiled, the tree loops run as Python, which indexes a list
+        # much faster than a NumPy array.
+        self.tree: IntBuffer
+        if COMPILED:
+            self.tree = np.zeros(size + 1, dtype=np.int64)
+        else:
+            self.tree = [0] * (size + 1)
+        # Top step of the find_kth descent, the largest power of two <= size
+        self.highbit = 1 << (size.bit_length() - 1) if size else 0
+
+    def build(self, values: np.ndarray):
+        """Replace the contents of the tree with values, in O(n)."""
+        self.tree[0] = 0
+        if isinstance(self.tree, list):
+            self.tree[1:] = values.tolist()
+        else:
+            self.tree[1:] = values
+        fenwick_build(self.tree)
 
     def add(self, i: int, delta: int):
         """Add delta to element i."""
-        i += 1  # 1-based index
-        while i < len(self.tree):
-            self.tree[i] += delta
-            i += i & (-i)
+        fenwick_add(self.tree, i, delta)
+
+    def add_batch(self, indices: np.ndarray, deltas: np.ndarray):
+        """Add deltas[j] to element indices[j] for every j, in O(n)."""
+        # The tree is linear in its values, so add the tree of the deltas
+        summed = np.zeros(len(self.tree) - 1, dtype=np.int64)
+        np.add.at(summed, indices, deltas)
+        delta_tree = FenwickTree(len(summed))
+        delta_tree.build(summed)
+        if isinstance(self.tree, list):
+            self.tree = [a + b for a, b in zip(self.tree, delta_tree.tree)]
+        else:
+            self.tree += delta_tree.tree
 
     def prefix_sum(self, i: int) -> int:
         """Compute prefix sum up to element i."""
-        i += 1  # 1-based index
-        s = 0
-        while i > 0:
-            s += self.tree[i]
-            i -= i & (-i)
-        return s
+        return int(fenwick_prefix_sum(self.tree, i))
 
     def find_kth(self, k: int) -> int:
         """Find the smallest index i such that prefix_sum(i) >= k."""
-        i = 0
-        p = 1 << (self.tree.size.bit_length() - 1)
-        while p > 0:
-            if i + p < len(self.tree) and self.tree[i + p] < k:
-                k -= self.tree[i + p]
-                i += p
-            p >>= 1
-        return i
+        return int(fenwick_find_kth(self.tree, k, self.highbit))
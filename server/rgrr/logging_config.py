@@ -1,4 +1,4 @@
 import logging
 
-def setup_logging():
-    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+def setup_logging(level: int = logging.DEBUG):
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s')
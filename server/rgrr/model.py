@@ -1,10 +1,68 @@
+from typing import List, Sequence, Union, overload
+
+import numpy as np
+
+
 class Node:
-    def __init__(self, id: int, resources: int = 0):
+    """A view of a single node, backed by the resource arrays of a Model."""
+
+    __slots__ = ('_model', 'id')
+
+    def __init__(self, model: 'Model', id: int):
+        self._model = model
         self.id = id
-        self.resources = resources
-        self.resources_added = 0
+
+    @property
+    def resources(self) -> int:
+        return int(self._model.resources[self.id])
+
+    @resources.setter
+    def resources(self, value: int):
+        self._model.resources[self.id] = value
+
+    @property
+    def resources_added(self) -> int:
+        return int(self._model.resources_added[self.id])
+
+    @resources_added.setter
+    def resources_added(self, value: int):
+        self._model.resources_added[self.id] = value
+
+
+class NodeList(Sequence[Node]):
+    """The nodes of a Model, each created as a view only when accessed."""
+
+    __slots__ = ('_model',)
+
+    def __init__(self, model: 'Model'):
+        self._model = model
+
+    def __len__(self) -> int:
+        return len(self._model.resources)
+
+    @overload
+    def __getitem__(self, index: int) -> Node: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Node]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Node, List[Node]]:
+        # Indexing a range handles negative indices, slices and IndexError
+        ids = range(len(self))[index]
+        if isinstance(ids, range):
+            return [Node(self._model, i) for i in ids]
+        return Node(self._model, ids)
+
 
 class Model:
+    """Node state stored as parallel arrays, one entry per node."""
+
     def __init__(self, size: int, resources_per_node: int = 0):
-        self.Nodes = [Node(i, resources_per_node) for i in range(size)]
+        self.resources = np.full(size, resources_per_node, dtype=np.int64)
+        self.resources_added = np.zeros(size, dtype=np.int64)
         self.total_resources = size * resources_per_node
+
+    @property
+    def Nodes(self) -> NodeList:
+        """The nodes, as views into the resource arrays."""
+        return NodeList(self)
@@ -1,8 +1,12 @@
 from __future__ import annotations
-import random
 import logging
+import math
+import numpy as np
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Optional, Union
+
+from rgrr._kernels import preferential_draw
+from rgrr.alias_table import AliasTable
 
 if TYPE_CHECKING:
     from rgrr.simulator import Simulator
@@ -54,33 +58,91 @@ class RandomResourceDistribution(ResourceDistributionOperation):
         return 'random'
 
     def _distribute(self, simulator: Simulator, total_resources: int):
-        for _ in range(total_resources):
-            random_node_id = random.randint(0, len(simulator.model.Nodes) - 1)
-            simulator.add_resources_to_node(random_node_id, 1)
+        if total_resources <= 0:
+            return
+        node_count = len(simulator.model.resources)
+        counts = simulator.np_rng.multinomial(total_resources, np.full(node_count, 1.0 / node_count))
+        simulator.add_resources(counts)
 
 
 class PreferentialResourceDistribution(ResourceDistributionOperation):
-    """Adds resources preferentially based on current resource count (rich get richer)."""
+    """Adds resources preferentially based on current resource count (rich get richer).
+
+    By default each resource is drawn using the weights left by the previous
+    draw. With a batch size, all draws in a batch use the weights from the
+    start of the batch, and are sampled from their cumulative sum or, for
+    many nodes, from alias tables built once per batch. Each batch costs time
+    in proportion to the number of nodes, so batching is only faster once
+    batches hold at least about as many resources as there are nodes; it
+    only approximates the sequential process. A batch size of 'auto' uses
+    the square root of the resources added, which bounds how stale the
+    weights get, but never fewer than the number of nodes.
+    """
+
+    # Number of random draws generated at a time, to bound memory use
+    DRAW_CHUNK = 1 << 16
+    # Below this many nodes, a binary search of the cumulative weights is
+    # cheaper per batch than building alias tables
+    ALIAS_MIN_NODES = 200
+
+    def __init__(self, resources_added: int, batch_size: Union[int, str, None] = None):
+        super().__init__(resources_added)
+        self.batch_size = batch_size
 
     @property
     def method(self) -> str:
         return 'preferential'
 
     def _distribute(self, simulator: Simulator, total_resources: int):
-        for _ in range(total_resources):
-            total_weight = simulator.model.total_resources
-            if total_weight == 0:
-                # If there are no resources, distribute randomly
-                random_node_id = random.randint(0, len(simulator.model.Nodes) - 1)
-                simulator.add_resources_to_node(random_node_id, 1)
-                continue
-
-            # Select node based on weighted probability using Fenwick Tree
-            rand_val = random.randint(1, total_weight)
-            node_id = simulator.fenwick_tree.find_kth(rand_val)
+        if total_resources <= 0:
+            return
+        model = simulator.model
+        if model.total_resources == 0:
+            # If there are no resources, distribute the first one randomly
+            random_node_id = simulator.np_rng.integers(len(model.resources))
+            simulator.add_resources_to_node(int(random_node_id), 1)
+            total_resources -= 1
+
+        if self.batch_size:
+            self._distribute_batched(simulator, total_resources)
+            return
 
-            # Add resource to the selected node
-            simulator.add_resources_to_node(node_id, 1)
+        # Select nodes based on weighted probability using the Fenwick Tree.
+        # Each draw adds one resource, so draw i picks from total_weight + i.
+        fenwick_tree = simulator.fenwick_tree
+        for start in range(0, total_resources, self.DRAW_CHUNK):
+            count = min(self.DRAW_CHUNK, total_resources - start)
+            highs = np.arange(model.total_resources, model.total_resources + count)
+            draws = simulator.np_rng.integers(1, highs, endpoint=True)
+            preferential_draw(fenwick_tree.tree, fenwick_tree.highbit, model.resources, model.resources_added, draws)
+            model.total_resources += count
+
+    def _batch_size(self, node_count: int, total_resources: int) -> int:
+        if self.batch_size == 'auto':
+            # Smaller batches would not amortize their per-node work
+            return max(1, math.isqrt(total_resources), node_count)
+        assert isinstance(self.batch_size, int)
+        return self.batch_size
+
+    def _distribute_batched(self, simulator: Simulator, total_resources: int):
+        node_count = len(simulator.model.resources)
+        batch_size = self._batch_size(node_count, total_resources)
+        remaining = total_resources
+        resources = simulator.model.resources
+        if resources.min() == resources.max():
+            # Equal weights make the first batch uniformly random
+            batch = min(batch_size, remaining)
+            simulator.add_resources(simulator.np_rng.multinomial(batch, np.full(node_count, 1.0 / node_count)))
+            remaining -= batch
+        while remaining > 0:
+            batch = min(batch_size, remaining)
+            if node_count < self.ALIAS_MIN_NODES:
+                draws = simulator.np_rng.integers(1, simulator.model.total_resources, size=batch, endpoint=True)
+                node_ids = np.searchsorted(np.cumsum(resources), draws)
+            else:
+                node_ids = AliasTable(resources).sample(simulator.np_rng, batch)
+            simulator.add_resources(np.bincount(node_ids, minlength=node_count))
+            remaining -= batch
 
 
 class UniformResourceDistribution(ResourceDistributionOperation):
@@ -91,13 +153,13 @@ class UniformResourceDistribution(ResourceDistributionOperation):
         return 'uniform'
 
     def _distribute(self, simulator: Simulator, total_resources: int):
-        if not simulator.model.Nodes:
+        node_count = len(simulator.model.resources)
+        if not node_count:
             return
-        resources_per_node = total_resources // len(simulator.model.Nodes)
-        remainder = total_resources % len(simulator.model.Nodes)
-        for i in range(len(simulator.model.Nodes)):
-            amount = resources_per_node + (1 if i < remainder else 0)
-            simulator.add_resources_to_node(i, amount)
+        resources_per_node, remainder = divmod(total_resources, node_count)
+        amounts = np.full(node_count, resources_per_node, dtype=np.int64)
+        amounts[:remainder] += 1
+        simulator.add_resources(amounts)
 
 class IncomeTaxCollectionOperation(SimulatorOperation):
     """Applies tax to resources added and collects it."""
@@ -112,13 +174,12 @@ class IncomeTaxCollectionOperation(SimulatorOperation):
         if self.tax_rate == 0:
             return
 
-        total_tax = 0
-        for node in simulator.model.Nodes:
-            tax_amount = int(node.resources_added * self.tax_rate)
-            if tax_amount > 0:
-                simulator.add_resources_to_node(node.id, -tax_amount)
-                total_tax += tax_amount
-        simulator.total_tax_collected += total_tax
+        simulator.pre_tax_resources = simulator.model.resources.copy()
+        # Truncate each node's tax toward zero, as int() would
+        tax = (simulator.model.resources_added * self.tax_rate).astype(np.int64)
+        np.maximum(tax, 0, out=tax)
+        simulator.add_resources(-tax)
+        simulator.total_tax_collected += int(tax.sum())
 
 class RequiredExpenditureOperation(SimulatorOperation):
     """Applies a required expenditure, reducing resources from each node."""
@@ -131,9 +192,7 @@ class RequiredExpenditureOperation(SimulatorOperation):
         if self.expenditure == 0:
             return
 
-        total_expenditure_incurred = 0
-        for node in simulator.model.Nodes:
-            amount_to_deduct = min(node.resources, self.expenditure) # Deduct up to 'expenditure' or node's current resources
-            simulator.add_resources_to_node(node.id, -amount_to_deduct)
-            total_expenditure_incurred += amount_to_deduct
-        simulator.total_expenditure_incurred = total_expenditure_incurred
+        # Deduct up to 'expenditure' or each node's current resources
+        amounts_to_deduct = np.minimum(simulator.model.resources, self.expenditure)
+        simulator.add_resources(-amounts_to_deduct)
+        simulator.total_expenditure_incurred = int(amounts_to_deduct.sum())
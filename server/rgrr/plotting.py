@@ -2,6 +2,7 @@ import matplotlib.pyplot as plt
 from matplotlib.widgets import RadioButtons
 import numpy as np
 from scipy.stats import pareto
+from typing import Dict, Optional, Tuple
 
 class EpochPlotter:
     def __init__(self):
@@ -10,6 +11,48 @@ class EpochPlotter:
         self.radio = None
         self.xlim = None
         self.ylim = None
+        # Pareto fit per epoch, as (alpha, loc, scale, x, pdf); fitting is slow
+        self._fit_cache: Dict[int, Tuple[float, float, float, np.ndarray, np.ndarray]] = {}
+        # Bin edges shared by every epoch once show() has seen them all, and
+        # the histogram densities per epoch over those edges
+        self.bin_edges: Optional[np.ndarray] = None
+        self._hist_cache: Dict[int, np.ndarray] = {}
+
+    @staticmethod
+    def _bin_edges(lo: float, hi: float) -> np.ndarray:
+        """Bin edges spanning lo to hi."""
+        # Log-spaced bins resolve the long tail of a power-law distribution
+        lo = max(lo, 1.0)
+        if hi > lo:
+            return np.logspace(np.log10(lo), np.log10(hi), 21)
+        return np.histogram_bin_edges([hi], bins=20)
+
+    @staticmethod
+    def _histograms(stacked: np.ndarray, bin_edges: np.ndarray) -> np.ndarray:
+        """Histogram densities of every epoch at once, as np.histogram gives them."""
+        bin_count = len(bin_edges) - 1
+        epochs, nodes = stacked.shape
+        # Values outside the edges are left out; the last bin is closed
+        inside = (stacked >= bin_edges[0]) & (stacked <= bin_edges[-1])
+        bins = np.clip(np.searchsorted(bin_edges, stacked, side='right') - 1, 0, bin_count - 1)
+        bins += np.arange(epochs)[:, np.newaxis] * bin_count
+        counts = np.bincount(bins[inside], minlength=epochs * bin_count).reshape(epochs, bin_count)
+        totals = counts.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return counts / (totals * np.diff(bin_edges))
+
+    @staticmethod
+    def _fit_pareto(distribution: np.ndarray) -> Tuple[float, float, float]:
+        """Maximum likelihood Pareto (shape, loc, scale) with loc fixed at 0."""
+        # The fit has a closed form. Nodes without resources are left out,
+        # since a Pareto distribution has no mass at zero.
+        positive = distribution[distribution > 0].astype(np.float64)
+        if not positive.size:
+            return float('nan'), 0.0, float('nan')
+        scale = float(positive.min())
+        with np.errstate(divide='ignore'):
+            shape = positive.size / np.log(positive / scale).sum()
+        return float(shape), 0.0, scale
 
     def plot_current_epoch(self):
         from .simulation_store import get_simulation # Imported locally to prevent circular dependency
@@ -17,15 +60,26 @@ class EpochPlotter:
         distributions = get_simulation("dummy").distributions
         distribution = distributions[self.current_epoch - 1]
 
-        self.ax.hist(distribution, bins=20, density=True, alpha=0.7, edgecolor='black', label='Resource Distribution')
+        lo = max(float(distribution.min()), 1.0)
+        hi = float(distribution.max())
+        bin_edges = self.bin_edges if self.bin_edges is not None else self._bin_edges(lo, hi)
+        counts = self._hist_cache.get(self.current_epoch)
+        if counts is None:
+            counts = np.histogram(distribution, bins=bin_edges, density=True)[0]
+            self._hist_cache[self.current_epoch] = counts
+        self.ax.hist(bin_edges[:-1], bins=bin_edges, weights=counts, alpha=0.7, edgecolor='black', label='Resource Distribution')
 
-        shape, loc, scale = pareto.fit(distribution, floc=0)
-        estimated_alpha = shape
+        fit = self._fit_cache.get(self.current_epoch)
+        if fit is None:
+            shape, loc, scale = self._fit_pareto(distribution)
+            x = np.linspace(lo, hi, 100)
+            x_positive = x[x > 0]
+            pareto_pdf = pareto.pdf(x_positive, b=shape, loc=loc, scale=scale)
+            fit = (shape, loc, scale, x_positive, pareto_pdf)
+            self._fit_cache[self.current_epoch] = fit
+        estimated_alpha, loc, scale, x_positive, pareto_pdf = fit
         self.ax.set_title(f'Epoch {self.current_epoch} with Theoretical Pareto Distribution (alpha={estimated_alpha:.2f})', fontsize=10)
 
-        x = np.linspace(min(distribution), max(distribution), 100)
-        x_positive = x[x > 0]
-        pareto_pdf = pareto.pdf(x_positive, b=estimated_alpha, loc=loc, scale=scale)
         self.ax.plot(x_positive, pareto_pdf, color='r', linestyle='--', label=f'Theoretical Pareto (alpha={estimated_alpha:.2f})')
 
         self.ax.set_xlabel('Resources')
@@ -57,17 +111,13 @@ class EpochPlotter:
     def show(self):
         from .simulation_store import get_simulation # Imported locally to prevent circular dependency
         distributions = get_simulation("dummy").distributions
-        # Determine global x and y ranges
-        global_min_x, global_max_x = float('inf'), float('-inf')
-        global_max_y = float('-inf')
-        for dist in distributions:
-            global_min_x = min(global_min_x, min(dist))
-            global_max_x = max(global_max_x, max(dist))
-            hist, _ = np.histogram(dist, bins=20, density=True)
-            global_max_y = max(global_max_y, hist.max())
-
-        # self.xlim = (global_min_x, global_max_x)
-        # self.ylim = (0, global_max_y * 1.1)  # Add a little padding
+        # Determine the global x range
+        stacked = np.asarray(distributions)
+        global_min_x, global_max_x = int(stacked.min()), int(stacked.max())
+        # Share bins across epochs so their histograms are comparable
+        self.bin_edges = self._bin_edges(global_min_x, global_max_x)
+        densities = self._histograms(stacked, self.bin_edges)
+        self._hist_cache = {epoch: counts for epoch, counts in enumerate(densities, start=1)}
 
         plt.subplots_adjust(left=0.3)
         radio_ax = plt.axes((0.05, 0.4, 0.15, 0.5), facecolor='lightgoldenrodyellow')
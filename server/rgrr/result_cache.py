@@ -0,0 +1,107 @@
+"""On-disk cache of finished simulations.
+
+Seeded simulations are deterministic, so a finished run can be reused for any
+fresh simulation with the same model, seed and operations.
+
+The cache is off unless RGRR_CACHE_DIR names a directory for it. Entries are
+pickles and are loaded as trusted, so the directory must not be writable by
+anyone untrusted.
+"""
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+import rgrr._kernels
+import rgrr.alias_table
+import rgrr.fenwick_tree
+import rgrr.model
+import rgrr.operations
+import rgrr.simulator
+from rgrr.simulator import MultiStepSimulator
+
+_cache_dir = os.environ.get('RGRR_CACHE_DIR')
+CACHE_DIR: Optional[Path] = Path(_cache_dir).resolve() if _cache_dir else None
+# Most finished simulations kept; the least recently used are deleted beyond this
+MAX_CACHE_ENTRIES = 256
+
+
+@functools.lru_cache(maxsize=None)
+def cache_version() -> str:
+    """A hash of the modules and NumPy version that determine simulation results.
+
+    NumPy does not keep its random Generator methods stable across versions,
+    so upgrading it, like any change to the modules, orphans the entries
+    written before. Computed on first use, so that the sources are only
+    read when the cache is on.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.__version__.encode())
+    for module in (rgrr._kernels, rgrr.alias_table, rgrr.fenwick_tree,
+                   rgrr.model, rgrr.operations, rgrr.simulator):
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
+def cache_key(simulator: MultiStepSimulator) -> Optional[str]:
+    """A key for everything that determines the simulator's results.
+
+    Returns None for unseeded simulations and for ones that have already run,
+    whose results are not reproducible from their configuration alone.
+    """
+    if simulator.seed is None or len(simulator.distributions):
+        return None
+    parts = (
+        cache_version(),
+        simulator.model.resources.tobytes(),
+        simulator.epochs,
+        simulator.expenditure_distribution_method,
+        simulator.simulator.np_rng.bit_generator.state,
+        [(type(op).__name__, sorted(vars(op).items())) for op in simulator.operations],
+    )
+    return hashlib.blake2b(repr(parts).encode()).hexdigest()
+
+
+def run_cached(simulator: MultiStepSimulator) -> MultiStepSimulator:
+    """Run the simulator, or load its finished copy from the cache."""
+    key = cache_key(simulator) if CACHE_DIR is not None else None
+    if CACHE_DIR is None or key is None:
+        simulator.run()
+        return simulator
+    path = CACHE_DIR / f'{key}.pickle'
+    try:
+        with path.open('rb') as f:
+            cached = pickle.load(f)
+        # Mark the entry as recently used
+        os.utime(path)
+        return cached
+    except FileNotFoundError:
+        pass
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        logging.warning(f"Ignoring unreadable cached simulation {path}: {e}")
+
+    simulator.run()
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial file
+        partial = path.with_suffix('.partial')
+        with partial.open('wb') as f:
+            pickle.dump(simulator, f)
+        partial.replace(path)
+        _evict(CACHE_DIR)
+    except OSError as e:
+        logging.warning(f"Could not cache simulation to {path}: {e}")
+    return simulator
+
+
+def _evict(cache_dir: Path):
+    """Delete the least recently used entries beyond MAX_CACHE_ENTRIES."""
+    entries = sorted(cache_dir.glob('*.pickle'), key=lambda entry: entry.stat().st_mtime_ns)
+    for entry in entries[:max(0, len(entries) - MAX_CACHE_ENTRIES)]:
+        entry.unlink(missing_ok=True)
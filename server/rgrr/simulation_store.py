@@ -1,19 +1,100 @@
-from typing import List
+import os
+import pickle
+import uuid
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Dict, List, Optional, Tuple
 from rgrr.simulator import MultiStepSimulator
 
-simulations = {}
+# Most simulations kept; the least recently used are dropped beyond this
+MAX_SIMULATIONS = 1024
 
-def store_simulation(id: str, simulator: MultiStepSimulator):
-    global simulations
+# With a Redis URL, simulations are kept in Redis so that every server
+# worker process sees the same ones. Otherwise they live in this process.
+# Redis drops a simulation this many seconds after it was last used.
+REDIS_URL = os.environ.get('RGRR_REDIS_URL')
+REDIS_TTL = 7 * 24 * 60 * 60
+_redis: Optional[Any] = None
+if REDIS_URL:
+    import redis  # type: ignore[import-not-found]
+    _redis = redis.Redis.from_url(REDIS_URL)
+
+# Guards simulations, which Flask may access from several request threads.
+# With Redis, these are local copies tagged with the version they were
+# loaded at, so repeated reads skip unpickling while that version is current.
+# Redis calls and pickling happen outside the lock so threads don't wait on them.
+_lock = RLock()
+simulations: 'OrderedDict[str, MultiStepSimulator]' = OrderedDict()
+_versions: Dict[str, bytes] = {}
+
+
+def _keep(id: str, simulator: MultiStepSimulator):
     simulations[id] = simulator
+    simulations.move_to_end(id)
+    if len(simulations) > MAX_SIMULATIONS:
+        evicted, _ = simulations.popitem(last=False)
+        _versions.pop(evicted, None)
+
+
+def _get_local(id: str) -> Optional[MultiStepSimulator]:
+    simulator = simulations.get(id)
+    if simulator is not None:
+        simulations.move_to_end(id)
+    return simulator
+
+
+def _redis_keys(id: str) -> Tuple[str, str]:
+    return f"sim:{id}", f"sim-version:{id}"
+
+
+def store_simulation(id: str, simulator: MultiStepSimulator):
+    if _redis is None:
+        with _lock:
+            _keep(id, simulator)
+        return
+    key, version_key = _redis_keys(id)
+    version = uuid.uuid4().hex.encode()
+    with _redis.pipeline() as pipe:
+        pipe.set(key, pickle.dumps(simulator), ex=REDIS_TTL)
+        pipe.set(version_key, version, ex=REDIS_TTL)
+        pipe.execute()
+    with _lock:
+        _versions[id] = version
+        _keep(id, simulator)
 
-def get_simulation(id: str) -> MultiStepSimulator:
-    global simulations
-    return simulations.get(id)
+def get_simulation(id: str) -> Optional[MultiStepSimulator]:
+    if _redis is not None:
+        key, version_key = _redis_keys(id)
+        with _redis.pipeline() as pipe:
+            pipe.get(version_key)
+            pipe.expire(version_key, REDIS_TTL)
+            pipe.expire(key, REDIS_TTL)
+            version = pipe.execute()[0]
+        if version is None:
+            return None
+        with _lock:
+            if _versions.get(id) == version:
+                simulator = _get_local(id)
+                if simulator is not None:
+                    return simulator
+        # Not loaded here yet, or another worker stored it since it was
+        raw = _redis.get(key)
+        if raw is None:
+            return None
+        simulator = pickle.loads(raw)
+        with _lock:
+            _versions[id] = version
+            _keep(id, simulator)
+        return simulator
+    with _lock:
+        return _get_local(id)
 
 
 def list_simulation_ids() -> List[str]:
     """
     Returns a list of all simulation IDs currently stored.
     """
-    return list(simulations.keys())
+    if _redis is not None:
+        return [key.decode()[len("sim:"):] for key in _redis.scan_iter(match="sim:*")]
+    with _lock:
+        return list(simulations.keys())
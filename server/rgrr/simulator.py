@@ -1,11 +1,20 @@
-import random
 import logging
-from typing import Optional, Sequence
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
 
 from rgrr.fenwick_tree import FenwickTree
 from rgrr.model import Model
 from rgrr.operations import SimulatorOperation, ResourceDistributionOperation
-from rgrr.plotting import EpochPlotter
+
+
+def numpy_seed(seed: Optional[int]) -> Optional[int]:
+    """Map any integer seed onto the non-negative 64-bit seeds NumPy accepts.
+
+    Negative seeds, which the random module accepted, keep working and each
+    still gives its own reproducible stream.
+    """
+    return None if seed is None else seed & ((1 << 64) - 1)
 
 
 class Simulator:
@@ -19,30 +28,51 @@ class Simulator:
         self.operations = operations
         self.total_tax_collected = 0
         self.total_expenditure_incurred = 0
-        if seed is not None:
-            random.seed(seed)
-        # Initialize Fenwick Tree for preferential attachment
-        self.fenwick_tree = FenwickTree(len(self.model.Nodes))
-        for i, node in enumerate(self.model.Nodes):
-            self.fenwick_tree.add(i, node.resources)
+        # Resources just before tax was collected, set by the tax operation
+        self.pre_tax_resources: Optional[np.ndarray] = None
+        self.np_rng = np.random.default_rng(numpy_seed(seed))
+        # Fenwick Tree for preferential attachment, created on first use so
+        # other distributions never pay for it. Updates only mark it dirty;
+        # it is rebuilt in one pass the next time it is used.
+        self._fenwick_tree: Optional[FenwickTree] = None
+        self._fenwick_dirty = True
+
+    @property
+    def fenwick_tree(self) -> FenwickTree:
+        """The Fenwick Tree over the current node resources."""
+        if self._fenwick_tree is None:
+            self._fenwick_tree = FenwickTree(len(self.model.resources))
+            self._fenwick_dirty = True
+        if self._fenwick_dirty:
+            self._fenwick_tree.build(self.model.resources)
+            self._fenwick_dirty = False
+        return self._fenwick_tree
 
     def add_resources_to_node(self, node_id: int, amount: int):
         """Add a specific amount of resources to a specific node."""
-        assert 0 <= node_id < len(self.model.Nodes)
-        self.model.Nodes[node_id].resources += amount
-        self.model.Nodes[node_id].resources_added += amount
+        assert 0 <= node_id < len(self.model.resources)
+        self.model.resources[node_id] += amount
+        self.model.resources_added[node_id] += amount
         self.model.total_resources += amount
-        self.fenwick_tree.add(node_id, amount)
+        self._fenwick_dirty = True
 
-    def get_resource_distribution(self):
-        """Get a list of resource counts for each node."""
-        return [node.resources for node in self.model.Nodes]
+    def add_resources(self, amounts: np.ndarray):
+        """Add a per-node amount of resources to every node at once."""
+        assert amounts.shape == self.model.resources.shape
+        self.model.resources += amounts
+        self.model.resources_added += amounts
+        self.model.total_resources += int(amounts.sum())
+        self._fenwick_dirty = True
+
+    def get_resource_distribution(self) -> np.ndarray:
+        """Get a snapshot of the resource counts for each node."""
+        return self.model.resources.copy()
 
     def run(self):
         """Run the simulation."""
         # Reset resources_added for all nodes at the beginning of each run
-        for node in self.model.Nodes:
-            node.resources_added = 0
+        self.model.resources_added[:] = 0
+        self.pre_tax_resources = None
 
         for operation in self.operations:
             operation.execute(self)
@@ -51,18 +81,20 @@ class Simulator:
 
     def get_status(self):
         """Return the final status of the simulation as a dictionary."""
-        distribution = self.get_resource_distribution()
+        distribution = self.model.resources
+        taxed = self.total_tax_collected > 0 and self.pre_tax_resources is not None
+        pre_tax = self.pre_tax_resources if taxed else distribution
         status = {
-            "min_resources": min(distribution),
-            "max_resources": max(distribution),
-            "average_resources": sum(distribution) / len(distribution)
+            "min_resources": int(pre_tax.min()),
+            "max_resources": int(pre_tax.max()),
+            "average_resources": float(pre_tax.mean())
         }
 
         if self.total_tax_collected > 0:
             status["total_tax_collected"] = self.total_tax_collected
-            status["post_tax_min_resources"] = min(distribution)
-            status["post_tax_max_resources"] = max(distribution)
-            status["post_tax_average_resources"] = sum(distribution) / len(distribution)
+            status["post_tax_min_resources"] = int(distribution.min())
+            status["post_tax_max_resources"] = int(distribution.max())
+            status["post_tax_average_resources"] = float(distribution.mean())
         if self.total_expenditure_incurred > 0:
             status["total_expenditure_incurred"] = self.total_expenditure_incurred
         return status
@@ -75,10 +107,23 @@ class MultiStepSimulator:
         self.operations = operations
         self.seed = seed
         self.expenditure_distribution_method = expenditure_distribution_method
-        self.distributions = []
+        # One row per epoch run so far, in a single preallocated array
+        self._distributions = np.empty((0, len(model.resources)), dtype=np.int64)
+        self._epochs_run = 0
+        # One simulator carries the RNG stream and Fenwick tree across epochs
+        self.simulator = Simulator(model, seed, [])
+
+    @property
+    def distributions(self) -> np.ndarray:
+        """The resource distribution after each epoch run, one row per epoch."""
+        return self._distributions[:self._epochs_run]
 
     def run(self):
         """Run the simulation for a specified number of epochs."""
+        # Make room for this run's epochs after any from earlier runs
+        grown = np.empty((self._epochs_run + self.epochs, len(self.model.resources)), dtype=np.int64)
+        grown[:self._epochs_run] = self.distributions
+        self._distributions = grown
         last_expenditure = 0
         last_tax_collected = 0
         for epoch in range(self.epochs):
@@ -90,26 +135,68 @@ class MultiStepSimulator:
             if last_tax_collected > 0:
                 current_operations.insert(0, ResourceDistributionOperation.create('uniform', last_tax_collected))
 
-            simulator = Simulator(self.model, self.seed, current_operations)
-            # Reset tax collected for the new epoch, as it's now handled between epochs
+            simulator = self.simulator
+            simulator.operations = current_operations
+            # Reset the totals for the new epoch, as they're now handled between epochs
             simulator.total_tax_collected = 0
+            simulator.total_expenditure_incurred = 0
             simulator.run()
             status = simulator.get_status()
 
             last_expenditure = status.get("total_expenditure_incurred", 0)
             last_tax_collected = status.get("total_tax_collected", 0)
 
-            logging.debug(f"\nResource distribution summary:")
-            logging.debug(f"  Min resources: {status['min_resources']}")
-            logging.debug(f"  Max resources: {status['max_resources']}")
-            logging.debug(f"  Average resources: {status['average_resources']:.2f}")
-
-            if "total_tax_collected" in status:
-                logging.debug(f"\nTotal tax collected: {status['total_tax_collected']}")
-                logging.debug(f"\nResource distribution after tax:")
-                logging.debug(f"  Min resources: {status['post_tax_min_resources']}")
-                logging.debug(f"  Max resources: {status['post_tax_max_resources']}")
-                logging.debug(f"  Average resources: {status['post_tax_average_resources']:.2f}")
-            if "total_expenditure_incurred" in status:
-                logging.debug(f"\nTotal expenditure incurred: {status['total_expenditure_incurred']}")
-            self.distributions.append(simulator.get_resource_distribution())
\ No newline at end of file
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(self._format_status(status))
+            self._distributions[self._epochs_run] = simulator.model.resources
+            self._epochs_run += 1
+
+    @staticmethod
+    def _format_status(status: dict) -> str:
+        """Format an epoch's status as a single multi-line summary."""
+        lines = [
+            "\nResource distribution summary:",
+            f"  Min resources: {status['min_resources']}",
+            f"  Max resources: {status['max_resources']}",
+            f"  Average resources: {status['average_resources']:.2f}",
+        ]
+        if "total_tax_collected" in status:
+            lines += [
+                f"\nTotal tax collected: {status['total_tax_collected']}",
+                "\nResource distribution after tax:",
+                f"  Min resources: {status['post_tax_min_resources']}",
+                f"  Max resources: {status['post_tax_max_resources']}",
+                f"  Average resources: {status['post_tax_average_resources']:.2f}",
+            ]
+        if "total_expenditure_incurred" in status:
+            lines.append(f"\nTotal expenditure incurred: {status['total_expenditure_incurred']}")
+        return "\n".join(lines)
+
+
+def _run_multi_step(simulator: MultiStepSimulator) -> MultiStepSimulator:
+    simulator.run()
+    return simulator
+
+
+def spawn_seeds(seed: Optional[int], count: int) -> List[int]:
+    """Derive seeds for independent simulations from a single seed.
+
+    The seeds come from spawned SeedSequence children, so their RNG streams
+    do not overlap the way consecutive seeds such as seed, seed + 1 could.
+    The same seed always gives the same list.
+    """
+    children = np.random.SeedSequence(numpy_seed(seed)).spawn(count)
+    return [int(child.generate_state(1, np.uint64)[0]) for child in children]
+
+
+def run_independent(simulators: Sequence[MultiStepSimulator],
+                    max_workers: Optional[int] = None) -> List[MultiStepSimulator]:
+    """Run independent simulations, such as a sweep over seeds, in parallel.
+
+    Each simulator runs in its own worker process, so the given simulators are
+    left unchanged; the finished copies are returned in the same order.
+    Epochs within one simulation depend on each other and still run in turn.
+    Use spawn_seeds to seed a sweep from one seed.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_run_multi_step, simulators))
@@ -0,0 +1,19 @@
+import numpy as np
+
+from rgrr.alias_table import AliasTable
+
+WEIGHTS = np.array([3, 0, 5, 1, 4, 0, 2, 6, 1], dtype=np.int64)
+
+def test_tables_reproduce_weights():
+    table = AliasTable(WEIGHTS)
+    n = len(WEIGHTS)
+    # Each slot keeps its own index with probability cutoff, else its alias
+    probabilities = np.bincount(np.arange(n), weights=table.cutoff, minlength=n)
+    probabilities += np.bincount(table.alias, weights=1 - table.cutoff, minlength=n)
+    np.testing.assert_allclose(probabilities / n, WEIGHTS / WEIGHTS.sum())
+
+def test_sample_skips_zero_weights():
+    table = AliasTable(WEIGHTS)
+    samples = table.sample(np.random.default_rng(0), 1000)
+    assert samples.min() >= 0 and samples.max() < len(WEIGHTS)
+    assert not np.isin(samples, np.flatnonzero(WEIGHTS == 0)).any()
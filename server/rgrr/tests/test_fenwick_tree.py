@@ -0,0 +1,47 @@
+import numpy as np
+
+from rgrr.fenwick_tree import FenwickTree
+
+VALUES = np.array([3, 0, 5, 1, 4, 0, 2, 6, 1], dtype=np.int64)
+
+def test_build_matches_incremental_adds():
+    built = FenwickTree(len(VALUES))
+    built.build(VALUES)
+    added = FenwickTree(len(VALUES))
+    for i, value in enumerate(VALUES):
+        added.add(i, int(value))
+    np.testing.assert_array_equal(built.tree, added.tree)
+
+def test_add_batch_matches_adds():
+    batched = FenwickTree(len(VALUES))
+    batched.build(VALUES)
+    added = FenwickTree(len(VALUES))
+    added.build(VALUES)
+    indices = np.array([2, 0, 2, 8, 5], dtype=np.int64)
+    deltas = np.array([4, -3, 1, 7, 2], dtype=np.int64)
+    batched.add_batch(indices, deltas)
+    for i, delta in zip(indices, deltas):
+        added.add(int(i), int(delta))
+    np.testing.assert_array_equal(batched.tree, added.tree)
+
+def test_prefix_sum():
+    tree = FenwickTree(len(VALUES))
+    tree.build(VALUES)
+    for i in range(len(VALUES)):
+        assert tree.prefix_sum(i) == VALUES[:i + 1].sum()
+
+def test_find_kth():
+    tree = FenwickTree(len(VALUES))
+    tree.build(VALUES)
+    cumulative = np.cumsum(VALUES)
+    for k in range(1, int(cumulative[-1]) + 1):
+        assert tree.find_kth(k) == np.searchsorted(cumulative, k)
+
+def test_find_kth_when_size_is_one_less_than_a_power_of_two():
+    values = VALUES[:7]
+    tree = FenwickTree(len(values))
+    tree.build(values)
+    assert tree.highbit == 4
+    cumulative = np.cumsum(values)
+    for k in range(1, int(cumulative[-1]) + 1):
+        assert tree.find_kth(k) == np.searchsorted(cumulative, k)
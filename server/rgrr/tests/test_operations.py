@@ -1,9 +1,9 @@
-import os
+import numpy as np
 import pytest
-import sys
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from rgrr.fenwick_tree import FenwickTree
+from rgrr.model import Model
 from rgrr.operations import (
     ResourceDistributionOperation,
     IncomeTaxCollectionOperation,
@@ -13,33 +13,28 @@ from rgrr.operations import (
     UniformResourceDistribution,
 )
 
-# Mocks for Simulator, Model, and Node
-class MockNode:
-    def __init__(self, id, resources=0, resources_added=0):
-        self.id = id
-        self.resources = resources
-        self.resources_added = resources_added
-
-class MockModel:
-    def __init__(self, num_nodes, initial_resources=0):
-        self.Nodes = [MockNode(i, initial_resources) for i in range(num_nodes)]
-        self.total_resources = num_nodes * initial_resources
-
+# Mock for Simulator, using the real Model and FenwickTree
 class MockSimulator:
     def __init__(self, num_nodes, initial_resources=0):
-        self.model = MockModel(num_nodes, initial_resources)
+        self.model = Model(num_nodes, initial_resources)
         self.total_tax_collected = 0
         self.total_expenditure_incurred = 0
-        # Mock Fenwick Tree
-        self.fenwick_tree = MagicMock()
-        self.fenwick_tree.find_kth.return_value = 0  # Default mock behavior
+        self.np_rng = np.random.default_rng(0)
+        self.fenwick_tree = FenwickTree(num_nodes)
+        self.fenwick_tree.build(self.model.resources)
 
     def add_resources_to_node(self, node_id, amount):
-        node = self.model.Nodes[node_id]
-        node.resources += amount
+        self.model.resources[node_id] += amount
         if amount > 0:
-            node.resources_added += amount
+            self.model.resources_added[node_id] += amount
         self.model.total_resources += amount
+        self.fenwick_tree.add(node_id, amount)
+
+    def add_resources(self, amounts):
+        self.model.resources += amounts
+        self.model.resources_added += np.maximum(amounts, 0)
+        self.model.total_resources += int(amounts.sum())
+        self.fenwick_tree.add_batch(np.arange(len(amounts)), amounts)
 
 @pytest.fixture
 def simulator():
@@ -61,18 +56,70 @@ def test_resource_distribution_factory():
 
 def test_random_distribution(simulator):
     op = RandomResourceDistribution(10)
-    with patch('random.randint', return_value=0):
-        op.execute(simulator)
-        assert simulator.model.Nodes[0].resources == 20
-        assert simulator.model.total_resources == 40
+    op.execute(simulator)
+    assert simulator.model.resources_added.sum() == 10
+    assert simulator.model.resources.sum() == 40
+    assert simulator.model.total_resources == 40
 
-def test_preferential_distribution(simulator):
-    op = PreferentialResourceDistribution(10)
-    simulator.model.total_resources = 30
-    simulator.fenwick_tree.find_kth.return_value = 1
+def test_random_distribution_single_node():
+    simulator = MockSimulator(num_nodes=1, initial_resources=10)
+    op = RandomResourceDistribution(10)
+    op.execute(simulator)
+    assert simulator.model.Nodes[0].resources == 20
+
+# Sequential draws, batches over the cumulative weights, batches from alias
+# tables, and batches sized automatically
+PREFERENTIAL_MODES = pytest.mark.parametrize('batch_size, alias_min_nodes', [
+    (None, PreferentialResourceDistribution.ALIAS_MIN_NODES),
+    (4, PreferentialResourceDistribution.ALIAS_MIN_NODES),
+    (4, 0),
+    ('auto', PreferentialResourceDistribution.ALIAS_MIN_NODES),
+])
+
+@PREFERENTIAL_MODES
+def test_preferential_distribution(simulator, batch_size, alias_min_nodes):
+    # Only node 1 holds resources, so every draw lands on it
+    simulator.add_resources_to_node(0, -10)
+    simulator.add_resources_to_node(2, -10)
+    op = PreferentialResourceDistribution(10, batch_size=batch_size)
+    op.ALIAS_MIN_NODES = alias_min_nodes
     op.execute(simulator)
     assert simulator.model.Nodes[1].resources == 20
-    assert simulator.model.total_resources == 40
+    assert simulator.model.Nodes[1].resources_added == 10
+    assert simulator.model.total_resources == 20
+
+@PREFERENTIAL_MODES
+def test_preferential_distribution_follows_weights(batch_size, alias_min_nodes):
+    # Each draw's expected share is the node's share of the starting weight
+    simulator = MockSimulator(num_nodes=3)
+    weights = np.array([1000, 3000, 6000])
+    for node_id, weight in enumerate(weights):
+        simulator.add_resources_to_node(node_id, int(weight))
+    simulator.model.resources_added[:] = 0
+    op = PreferentialResourceDistribution(30000, batch_size=batch_size)
+    op.ALIAS_MIN_NODES = alias_min_nodes
+    op.execute(simulator)
+    shares = simulator.model.resources_added / 30000
+    np.testing.assert_allclose(shares, weights / weights.sum(), atol=0.03)
+
+def test_auto_batch_size_covers_every_node():
+    op = PreferentialResourceDistribution(10, batch_size='auto')
+    assert op._batch_size(node_count=10, total_resources=10000) == 100
+    assert op._batch_size(node_count=100000, total_resources=1000000) == 100000
+
+def test_batched_preferential_distribution_with_equal_resources(simulator):
+    op = PreferentialResourceDistribution(30, batch_size=20)
+    op.execute(simulator)
+    assert simulator.model.resources_added.sum() == 30
+    assert simulator.model.total_resources == 60
+
+def test_preferential_distribution_without_resources():
+    simulator = MockSimulator(num_nodes=3, initial_resources=0)
+    op = PreferentialResourceDistribution(10)
+    op.execute(simulator)
+    assert simulator.model.resources.sum() == 10
+    assert simulator.model.total_resources == 10
+    assert simulator.fenwick_tree.prefix_sum(2) == 10
 
 def test_uniform_distribution(simulator):
     op = UniformResourceDistribution(10)
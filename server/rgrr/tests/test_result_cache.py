@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import rgrr.result_cache as rc
+from rgrr.model import Model
+from rgrr.operations import ResourceDistributionOperation
+from rgrr.simulator import MultiStepSimulator
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rc, 'CACHE_DIR', tmp_path)
+    return tmp_path
+
+def make_simulator(seed=42):
+    operations = [ResourceDistributionOperation.create('preferential', 50)]
+    return MultiStepSimulator(Model(5, 10), 2, seed, operations)
+
+def test_cached_run_matches_fresh_run(cache_dir):
+    first = rc.run_cached(make_simulator())
+    assert len(list(cache_dir.iterdir())) == 1
+    second = rc.run_cached(make_simulator())
+    assert second is not first
+    np.testing.assert_array_equal(second.distributions, first.distributions)
+    assert second.model.total_resources == first.model.total_resources
+
+def test_key_depends_on_configuration():
+    assert rc.cache_key(make_simulator(1)) != rc.cache_key(make_simulator(2))
+
+def test_key_depends_on_numpy_version(monkeypatch):
+    key = rc.cache_key(make_simulator())
+    monkeypatch.setattr(np, '__version__', '0.0.0')
+    rc.cache_version.cache_clear()
+    try:
+        assert rc.cache_key(make_simulator()) != key
+    finally:
+        rc.cache_version.cache_clear()
+
+def test_unseeded_and_finished_simulations_are_not_cached(cache_dir):
+    rc.run_cached(make_simulator(seed=None))
+    simulator = make_simulator()
+    simulator.run()
+    assert rc.cache_key(simulator) is None
+    assert not list(cache_dir.iterdir())
+
+def test_cache_is_off_without_a_directory(monkeypatch):
+    monkeypatch.setattr(rc, 'CACHE_DIR', None)
+    simulator = make_simulator()
+    assert rc.run_cached(simulator) is simulator
+    assert len(simulator.distributions) == 2
+
+def test_least_recently_used_entries_are_deleted(cache_dir, monkeypatch):
+    monkeypatch.setattr(rc, 'MAX_CACHE_ENTRIES', 2)
+    for seed in (1, 2, 3):
+        rc.run_cached(make_simulator(seed))
+    assert len(list(cache_dir.iterdir())) == 2
+    assert not (cache_dir / f'{rc.cache_key(make_simulator(1))}.pickle').exists()
@@ -1,37 +1,81 @@
 from flask import Flask, request
+import numpy as np
 import numpy.testing as npt
-import os
-import sys
+from types import SimpleNamespace
 import unittest
-from unittest.mock import patch, Mock
-
-# Add the project root to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from unittest.mock import patch
 
+import rgrr.server as server
 from rgrr.server import app
 import rgrr.simulation_store as sr
+from rgrr.model import Model
+from rgrr.operations import IncomeTaxCollectionOperation, RandomResourceDistribution, SimulatorOperation
+from rgrr.simulator import MultiStepSimulator
+
+# Histograms of the distributions [[10, 20, 30], [15, 25, 35]]: 20 bins of
+# width 1.25, each value's bin holding density 1 / (3 * 1.25)
+EXP_BIN_EDGES = np.linspace(10.0, 35.0, 21)
+EXP_EPOCH_DISTS = np.zeros((2, 20))
+EXP_EPOCH_DISTS[0, [0, 8, 16]] = 1 / (3 * 1.25)
+EXP_EPOCH_DISTS[1, [4, 12, 19]] = 1 / (3 * 1.25)
 
 
 class TestServerEndpoints(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.test_app = app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        server.shutdown_pool()
+
     def setUp(self):
-        self.test_app = app.test_client()
         sr.simulations.clear()
 
     def tearDown(self):
         sr.simulations.clear()
 
+    def _wait_for_run(self, id):
+        # A successful run leaves the jobs once its callback stores it
+        with server._jobs_lock:
+            job = server._jobs.get(id)
+        if job is not None:
+            job.exception(timeout=60)
+
 
     @patch('rgrr.simulation_store.get_simulation')
     def test_get_distribution_existing_simulation(self, mock_get_simulation):
-        sim_mock = Mock()
-        sim_mock.distributions = [[10, 20, 30], [15, 25, 35]]
-        mock_get_simulation.return_value = sim_mock
+        sim_stub = SimpleNamespace(distributions=[[10, 20, 30], [15, 25, 35]])
+        mock_get_simulation.return_value = sim_stub
         response = self.test_app.get('/simulations/123/distributions')
         self.assertEqual(response.status_code, 200)
         data = response.get_json()
         self.assertEqual(data, [[10, 20, 30], [15, 25, 35]])
 
 
+    @patch('rgrr.simulation_store.get_simulation')
+    def test_get_distribution_after_more_epochs(self, mock_get_simulation):
+        sim_stub = SimpleNamespace(distributions=[[10, 20, 30]])
+        mock_get_simulation.return_value = sim_stub
+        self.test_app.get('/simulations/123/distributions')
+        sim_stub.distributions.append([15, 25, 35])
+        response = self.test_app.get('/simulations/123/distributions')
+        self.assertEqual(response.get_json(), [[10, 20, 30], [15, 25, 35]])
+
+
+    @patch('rgrr.simulation_store.get_simulation')
+    def test_get_distribution_revalidates_with_etag(self, mock_get_simulation):
+        sim_stub = SimpleNamespace(distributions=[[10, 20, 30]])
+        mock_get_simulation.return_value = sim_stub
+        etag = self.test_app.get('/simulations/123/distributions').headers['ETag']
+        response = self.test_app.get('/simulations/123/distributions', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        sim_stub.distributions.append([15, 25, 35])
+        response = self.test_app.get('/simulations/123/distributions', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+
     @patch('rgrr.simulation_store.get_simulation')
     def test_get_distribution_non_existing_simulation(self, mock_get_simulation):
         mock_get_simulation.return_value = None
@@ -43,20 +87,24 @@ class TestServerEndpoints(unittest.TestCase):
 
     @patch('rgrr.simulation_store.get_simulation')
     def test_get_histogram_existing_simulation(self, mock_get_simulation):
-        sim_mock = Mock()
-        sim_mock.distributions = [[10, 20, 30], [15, 25, 35]]
-        mock_get_simulation.return_value = sim_mock
+        sim_stub = SimpleNamespace(distributions=[[10, 20, 30], [15, 25, 35]])
+        mock_get_simulation.return_value = sim_stub
         response = self.test_app.get('/simulations/123/histograms')
         self.assertEqual(response.status_code, 200)
         data = response.get_json()
         self.assertEqual(data.keys(), {'bin_edges', 'epoch_distributions'})
-        exp_bin_edges = [10.0, 11.25, 12.5, 13.75, 15.0, 16.25, 17.5, 18.75, 20.0, 21.25, 22.5, 23.75, 25.0, 26.25, 27.5, 28.75, 30.0, 31.25, 32.5, 33.75, 35.0]
-        npt.assert_almost_equal(data['bin_edges'], exp_bin_edges)
-        exp_epoch_dists = [
-                [0.26666666666666666, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.26666666666666666, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.26666666666666666, 0.0, 0.0, 0.0],
-                [0.0, 0.0, 0.0, 0.0, 0.26666666666666666, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.26666666666666666, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.26666666666666666]
-            ]
-        npt.assert_almost_equal(data['epoch_distributions'], exp_epoch_dists)
+        npt.assert_allclose(data['bin_edges'], EXP_BIN_EDGES, rtol=0, atol=1e-9)
+        npt.assert_allclose(data['epoch_distributions'], EXP_EPOCH_DISTS, rtol=0, atol=1e-9)
+
+
+    @patch('rgrr.simulation_store.get_simulation')
+    def test_get_histogram_after_more_epochs(self, mock_get_simulation):
+        sim_stub = SimpleNamespace(distributions=[[10, 20, 30]])
+        mock_get_simulation.return_value = sim_stub
+        self.test_app.get('/simulations/123/histograms')
+        sim_stub.distributions.append([15, 25, 35])
+        response = self.test_app.get('/simulations/123/histograms')
+        self.assertEqual(len(response.get_json()['epoch_distributions']), 2)
 
 
     @patch('rgrr.simulation_store.get_simulation')
@@ -68,6 +116,23 @@ class TestServerEndpoints(unittest.TestCase):
         self.assertEqual(data['error'], 'Simulation 123 not found.')
 
 
+    @patch('rgrr.server.MAX_CACHED_RESPONSES', 2)
+    @patch('rgrr.simulation_store.get_simulation')
+    def test_response_cache_keeps_most_recent_responses(self, mock_get_simulation):
+        server._distributions_cache.clear()
+        for id in ('a', 'b', 'c'):
+            mock_get_simulation.return_value = SimpleNamespace(distributions=[[1, 2]])
+            self.test_app.get(f'/simulations/{id}/distributions')
+        self.assertEqual(list(server._distributions_cache), ['b', 'c'])
+
+    @patch('rgrr.simulation_store.MAX_SIMULATIONS', 2)
+    def test_store_drops_least_recently_used_simulation(self):
+        sr.store_simulation('a', SimpleNamespace())
+        sr.store_simulation('b', SimpleNamespace())
+        sr.get_simulation('a')
+        sr.store_simulation('c', SimpleNamespace())
+        self.assertEqual(sr.list_simulation_ids(), ['a', 'c'])
+
     def test_swagger_json(self):
         response = self.test_app.get('/swagger.json')
         self.assertEqual(response.status_code, 200)
@@ -114,6 +179,92 @@ class TestServerEndpoints(unittest.TestCase):
         self.assertIsInstance(hist_data['epoch_distributions'], list)
         self.assertGreater(len(hist_data['epoch_distributions']), 0)
 
+    def test_run_missing_simulation_returns_error(self):
+        response = self.test_app.post('/simulations/missing/run')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json()['error'], 'Simulation missing not found.')
+
+    def test_create_simulation_rejects_invalid_parameters(self):
+        response = self.test_app.post('/simulations', json={
+            "nodes": 10,
+            "resources_per_node": 1,
+            "operations": [{"type": "bogus"}]
+        })
+        self.assertEqual(response.status_code, 400)
+        details = response.get_json()['details']
+        self.assertIn('epochs', details)
+        self.assertIn('operations', details)
+
+    def test_create_and_run_simulation_with_negative_seed(self):
+        simulation_config = {"nodes": 10, "epochs": 1, "resources_per_node": 1, "seed": -1,
+                             "operations": [{"type": "preferential", "resources_added": 20}]}
+        response = self.test_app.post('/simulations', json=simulation_config)
+        self.assertEqual(response.status_code, 201)
+        simulation_id = response.get_json()['id']
+        run_response = self.test_app.post(f'/simulations/{simulation_id}/run')
+        self.assertEqual(run_response.status_code, 200)
+
+    def test_create_simulation_rejects_out_of_range_parameters(self):
+        valid = {"nodes": 10, "epochs": 1, "resources_per_node": 1, "operations": []}
+        cases = [
+            ("nodes", {"nodes": 0}),
+            ("epochs", {"epochs": -1}),
+            ("resources_per_node", {"resources_per_node": -1}),
+            ("seed", {"seed": 1 << 64}),
+            ("seed", {"seed": -(1 << 63) - 1}),
+            ("operations", {"operations": [{"type": "random", "resources_added": -5}]}),
+            ("operations", {"operations": [{"type": "expenditure", "expenditure": -2}]}),
+            ("operations", {"operations": [{"type": "tax", "tax_rate": 1.5}]}),
+        ]
+        for field, change in cases:
+            with self.subTest(change=change):
+                response = self.test_app.post('/simulations', json={**valid, **change})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.get_json()['details'])
+
+    def test_run_simulation_asynchronously(self):
+        simulation_config = {
+            "nodes": 10,
+            "epochs": 2,
+            "resources_per_node": 1,
+            "operations": [{"type": "random", "resources_added": 5}]
+        }
+        simulation_id = self.test_app.post('/simulations', json=simulation_config).get_json()['id']
+        status_response = self.test_app.get(f'/simulations/{simulation_id}/status')
+        self.assertEqual(status_response.get_json()['status'], 'created')
+
+        run_response = self.test_app.post(f'/simulations/{simulation_id}/run?async=1')
+        self.assertEqual(run_response.status_code, 202)
+        self._wait_for_run(simulation_id)
+
+        # Polling the status stores the finished run
+        status_response = self.test_app.get(f'/simulations/{simulation_id}/status')
+        self.assertEqual(status_response.get_json()['status'], 'completed')
+        dist_response = self.test_app.get(f'/simulations/{simulation_id}/distributions')
+        self.assertEqual(len(dist_response.get_json()), 2)
+
+    def test_failed_asynchronous_run_reports_its_error(self):
+        operations = [IncomeTaxCollectionOperation(1.5)]
+        sr.store_simulation('failing', MultiStepSimulator(Model(3, 1), 1, None, operations))
+        run_response = self.test_app.post('/simulations/failing/run?async=1')
+        self.assertEqual(run_response.status_code, 202)
+        self._wait_for_run('failing')
+
+        status = self.test_app.get('/simulations/failing/status').get_json()
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['error'], 'Tax rate must be between 0 and 1.')
+
+    @patch('rgrr.server._get_pool', side_effect=RuntimeError('no workers'))
+    def test_asynchronous_run_reports_pool_errors_as_json(self, _):
+        sr.store_simulation('a', MultiStepSimulator(Model(3, 1), 1, None, []))
+        response = self.test_app.post('/simulations/a/run?async=1')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json()['error'], 'Failed to run simulation a: no workers')
+
+    @patch('multiprocessing.get_all_start_methods', return_value=['spawn'])
+    def test_workers_are_spawned_without_forkserver(self, _):
+        self.assertEqual(server._start_method(), 'spawn')
+
     def test_list_simulations_empty(self):
         """
         Test that GET /simulations returns an empty list when no simulations exist.
@@ -150,9 +301,7 @@ class TestServerEndpoints(unittest.TestCase):
         self.assertEqual(list_response.status_code, 200)
         retrieved_ids = list_response.get_json()
         self.assertIsInstance(retrieved_ids, list)
-        self.assertIn(sim_id1, retrieved_ids)
-        self.assertIn(sim_id2, retrieved_ids)
-        self.assertEqual(len(retrieved_ids), 2)
+        self.assertCountEqual(retrieved_ids, [sim_id1, sim_id2])
 
     def test_get_simulation_details(self):
         """Test that GET /simulations/<id> returns correct simulation details."""
@@ -194,16 +343,34 @@ class TestServerEndpoints(unittest.TestCase):
         )
         for i, op_data in enumerate(details_data["operations"]):
             expected_op = simulation_config["operations"][i]
-            self.assertEqual(op_data["type"], expected_op["type"])
-            if "resources_added" in expected_op:
-                self.assertEqual(
-                    op_data["resources_added"], expected_op["resources_added"]
-                )
-            if "tax_rate" in expected_op:
-                self.assertEqual(op_data["tax_rate"], expected_op["tax_rate"])
-            if "expenditure" in expected_op:
-                self.assertEqual(op_data["expenditure"], expected_op["expenditure"])
-
+            with self.subTest(operation=expected_op["type"]):
+                self.assertEqual(op_data["type"], expected_op["type"])
+                if "resources_added" in expected_op:
+                    self.assertEqual(
+                        op_data["resources_added"], expected_op["resources_added"]
+                    )
+                if "tax_rate" in expected_op:
+                    self.assertEqual(op_data["tax_rate"], expected_op["tax_rate"])
+                if "expenditure" in expected_op:
+                    self.assertEqual(op_data["expenditure"], expected_op["expenditure"])
+
+
+    def test_details_of_operation_subclasses(self):
+        class ScaledRandomDistribution(RandomResourceDistribution):
+            pass
+
+        class NoOperation(SimulatorOperation):
+            def execute(self, simulator):
+                pass
+
+        operations = [ScaledRandomDistribution(5), NoOperation()]
+        sr.store_simulation('custom', MultiStepSimulator(Model(2, 1), 1, None, operations))
+        response = self.test_app.get('/simulations/custom')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['operations'], [
+            {"type": "random", "resources_added": 5},
+            {"type": "", "resources_added": 0, "tax_rate": 0.0, "expenditure": 0},
+        ])
 
     def test_details_of_missing_simulation_return_error(self):
         # Test for non-existent simulation
@@ -246,18 +413,8 @@ class TestServerEndpoints(unittest.TestCase):
             "epochs": initial_config["epochs"],
             "resources_per_node": initial_config["resources_per_node"],
             "seed": initial_config["seed"],
-            "operations": [],
+            "operations": initial_config["operations"],
         }
 
-        for op in initial_config["operations"]:
-            op_copy = op.copy()
-            if op_copy["type"] == "random":
-                op_copy["type"] = "random"
-            elif op_copy["type"] == "tax":
-                op_copy["type"] = "tax"
-            elif op_copy["type"] == "expenditure":
-                op_copy["type"] = "expenditure"
-            expected_details["operations"].append(op_copy)
-
         # Compare fetched details with expected details
         self.assertDictEqual(fetched_details, expected_details)
@@ -0,0 +1,101 @@
+import fnmatch
+import pickle
+
+import pytest
+
+import rgrr.simulation_store as sr
+from rgrr.model import Model
+from rgrr.simulator import MultiStepSimulator
+
+class FakeRedis:
+    """The few Redis commands the store uses, over a dict."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def expire(self, key, seconds):
+        if key in self.data:
+            self.ttls[key] = seconds
+
+    def scan_iter(self, match):
+        return [key.encode() for key in self.data if fnmatch.fnmatch(key, match)]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+class FakePipeline:
+    """Queues commands and runs them against a FakeRedis on execute."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+        return lambda *args, **kwargs: self.commands.append((method, args, kwargs))
+
+    def execute(self):
+        return [method(*args, **kwargs) for method, args, kwargs in self.commands]
+
+@pytest.fixture(autouse=True)
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(sr, '_redis', fake)
+    monkeypatch.setattr(sr, 'simulations', type(sr.simulations)())
+    monkeypatch.setattr(sr, '_versions', {})
+    return fake
+
+def make_simulator():
+    return MultiStepSimulator(Model(3, 1), 1, 1, [])
+
+def test_stored_simulation_is_read_back_without_unpickling(redis):
+    simulator = make_simulator()
+    sr.store_simulation('a', simulator)
+    assert 'sim:a' in redis.data
+    assert sr.get_simulation('a') is simulator
+
+def test_missing_simulation():
+    assert sr.get_simulation('missing') is None
+
+def test_simulation_stored_by_another_worker_is_reloaded(redis):
+    sr.store_simulation('a', make_simulator())
+    # Another worker stores a new version, which this worker has not seen
+    other = make_simulator()
+    other.run()
+    redis.data['sim:a'] = pickle.dumps(other)
+    redis.data['sim-version:a'] = b'from another worker'
+    reloaded = sr.get_simulation('a')
+    assert len(reloaded.distributions) == 1
+    assert sr.get_simulation('a') is reloaded
+
+def test_simulation_known_only_to_redis_is_loaded(redis):
+    sr.store_simulation('a', make_simulator())
+    sr.simulations.clear()
+    sr._versions.clear()
+    assert isinstance(sr.get_simulation('a'), MultiStepSimulator)
+
+def test_list_simulation_ids_scans_redis():
+    sr.store_simulation('a', make_simulator())
+    sr.store_simulation('b', make_simulator())
+    assert sorted(sr.list_simulation_ids()) == ['a', 'b']
+
+def test_simulations_expire_from_redis_unless_used(redis):
+    sr.store_simulation('a', make_simulator())
+    assert redis.ttls == {'sim:a': sr.REDIS_TTL, 'sim-version:a': sr.REDIS_TTL}
+    redis.ttls.clear()
+    sr.get_simulation('a')
+    assert redis.ttls == {'sim:a': sr.REDIS_TTL, 'sim-version:a': sr.REDIS_TTL}
@@ -1,15 +1,14 @@
+import numpy as np
 import unittest
-import sys
-import os
-
-# Add the project root to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 import rgrr.simulator as sim
+from main import run_simulations_from_args
+from rgrr.cli import build_parser
 from rgrr.model import Model
 from rgrr.operations import (
     ResourceDistributionOperation,
     IncomeTaxCollectionOperation,
+    PreferentialResourceDistribution,
     RequiredExpenditureOperation
 )
 
@@ -25,34 +24,55 @@ class TestSimulator(unittest.TestCase):
         # Test that Model initializes total_resources correctly
         self.assertEqual(self.m.total_resources, self.initial_nodes * self.initial_resources_per_node)
 
-    def test_run_random(self):
-        resources_to_add = 100
-        initial_total = self.m.total_resources
-        operations = [ResourceDistributionOperation.create('random', resources_to_add)]
+    def test_node_views_share_model_arrays(self):
+        # Nodes are views into the model's resource arrays
+        self.m.Nodes[2].resources += 5
+        self.assertEqual(self.m.resources[2], self.initial_resources_per_node + 5)
+        self.m.resources_added[3] = 7
+        self.assertEqual(self.m.Nodes[3].resources_added, 7)
+        # The views are made on access, so none are stored or pickled
+        self.assertEqual(len(self.m.Nodes), self.initial_nodes)
+        self.assertEqual(self.m.Nodes[-1].id, self.initial_nodes - 1)
+        self.assertNotIn('Nodes', vars(self.m))
+
+    def test_fenwick_tree_follows_resource_updates(self):
+        simulator = sim.Simulator(self.m, 42, [])
+        simulator.add_resources_to_node(1, 7)
+        simulator.add_resources(np.arange(self.initial_nodes))
+        tree = simulator.fenwick_tree
+        for i in range(self.initial_nodes):
+            self.assertEqual(tree.prefix_sum(i), self.m.resources[:i + 1].sum())
+
+    def test_fenwick_tree_is_created_on_first_use(self):
+        operations = [ResourceDistributionOperation.create('uniform', 100)]
         simulator = sim.Simulator(self.m, 42, operations)
         simulator.run()
-        self.assertEqual(self.m.total_resources, initial_total + resources_to_add)
+        self.assertIsNone(simulator._fenwick_tree)
+        self.assertEqual(simulator.fenwick_tree.prefix_sum(self.initial_nodes - 1), self.m.total_resources)
 
-    def test_run_preferential(self):
+    def test_run_distribution_methods(self):
         resources_to_add = 100
-        operations = [ResourceDistributionOperation.create('preferential', resources_to_add)]
-        simulator = sim.Simulator(self.m, 42, operations)
-        initial_total = self.m.total_resources
-        simulator.run()
-        self.assertEqual(self.m.total_resources, initial_total + resources_to_add)
-
-    def test_run_uniformly(self):
+        for method in ('random', 'preferential', 'uniform'):
+            with self.subTest(method=method):
+                m = Model(self.initial_nodes, self.initial_resources_per_node)
+                operations = [ResourceDistributionOperation.create(method, resources_to_add)]
+                simulator = sim.Simulator(m, 42, operations)
+                initial_total = m.total_resources
+                simulator.run()
+                self.assertEqual(m.total_resources, initial_total + resources_to_add)
+                if method == 'uniform':
+                    # Check for uniform distribution (within 1 resource difference)
+                    distribution = simulator.get_resource_distribution()
+                    self.assertTrue(np.ptp(distribution) <= 1)
+
+    def test_run_preferential_batched(self):
         resources_to_add = 100
-        operations = [ResourceDistributionOperation.create('uniform', resources_to_add)]
+        operations = [PreferentialResourceDistribution(resources_to_add, batch_size=10)]
         simulator = sim.Simulator(self.m, 42, operations)
         initial_total = self.m.total_resources
         simulator.run()
         self.assertEqual(self.m.total_resources, initial_total + resources_to_add)
-        # Check for uniform distribution (within 1 resource difference)
-        distribution = simulator.get_resource_distribution()
-        min_res = min(distribution)
-        max_res = max(distribution)
-        self.assertTrue(max_res - min_res <= 1)
+        self.assertEqual(simulator.fenwick_tree.prefix_sum(self.initial_nodes - 1), self.m.total_resources)
 
     def test_apply_tax(self):
         tax_rate = 0.1
@@ -68,6 +88,26 @@ class TestSimulator(unittest.TestCase):
         # Tax is collected but not redistributed in the same epoch.
         self.assertGreater(simulator.total_tax_collected, 0)
         self.assertEqual(self.m.total_resources, initial_total_resources + resources_to_add - simulator.total_tax_collected)
+        # Each node pays the truncated tax on what it was given
+        added = simulator.pre_tax_resources - self.initial_resources_per_node
+        tax = (added * tax_rate).astype(np.int64)
+        np.testing.assert_array_equal(self.m.resources, simulator.pre_tax_resources - tax)
+        self.assertEqual(tax.sum(), simulator.total_tax_collected)
+
+    def test_status_reports_resources_before_and_after_tax(self):
+        operations = [
+            ResourceDistributionOperation.create('uniform', 100),
+            IncomeTaxCollectionOperation(0.5)
+        ]
+        simulator = sim.Simulator(self.m, 42, operations)
+        simulator.run()
+        status = simulator.get_status()
+        # Each node grows from 10 to 30, then pays half of the 20 added
+        self.assertEqual(status["min_resources"], 30)
+        self.assertEqual(status["max_resources"], 30)
+        self.assertEqual(status["total_tax_collected"], 50)
+        self.assertEqual(status["post_tax_min_resources"], 20)
+        self.assertEqual(status["post_tax_average_resources"], 20.0)
 
     def test_apply_required_expenditure(self):
         expenditure_per_node = 5
@@ -112,6 +152,16 @@ class TestMultiStepSimulator(unittest.TestCase):
         expected_total_resources = initial_total_resources + (epochs * resources_to_add)
         self.assertEqual(self.m.total_resources, expected_total_resources)
 
+    def test_distributions_grow_with_each_run(self):
+        operations = [ResourceDistributionOperation.create('uniform', 5)]
+        multi_step_simulator = sim.MultiStepSimulator(self.m, 2, 42, operations)
+        self.assertEqual(multi_step_simulator.distributions.shape, (0, self.initial_nodes))
+        multi_step_simulator.run()
+        multi_step_simulator.run()
+        distributions = multi_step_simulator.distributions
+        self.assertEqual(distributions.shape, (4, self.initial_nodes))
+        np.testing.assert_array_equal(distributions.sum(axis=1), [55, 60, 65, 70])
+
     def test_expenditure_redistribution(self):
         epochs = 2
         resources_to_add = 20
@@ -153,14 +203,45 @@ class TestMultiStepSimulator(unittest.TestCase):
         # In epoch 1:
         # Start with 5*10 = 50 resources.
         # Add 100 resources randomly -> 150 total.
-        # Tax at 0.1 on the 100 added resources. With seed 42, total tax collected is 8.
-        # End of epoch 1 total resources = 150 - 8 = 142.
+        # Tax at 0.1 on the 100 added resources. With seed 42, total tax collected is 7.
+        # End of epoch 1 total resources = 150 - 7 = 143.
         # In epoch 2:
-        # Redistribute 8 resources from tax uniformly. Total resources = 142 + 8 = 150.
+        # Redistribute 7 resources from tax uniformly. Total resources = 143 + 7 = 150.
         # Add 100 resources randomly -> 150 + 100 = 250.
-        # Tax at 0.1 on the 100 added resources. With seed 42, total tax collected is 8.
-        # End of epoch 2 total resources = 250 - 8 = 242.
-        self.assertEqual(self.m.total_resources, 242)
+        # Tax at 0.1 on the 107 added resources. With seed 42, total tax collected is 9.
+        # End of epoch 2 total resources = 250 - 9 = 241.
+        self.assertEqual(self.m.total_resources, 241)
+
+    def test_run_independent_matches_serial_runs(self):
+        operations = [ResourceDistributionOperation.create('preferential', 50)]
+        def make(seed):
+            return sim.MultiStepSimulator(Model(self.initial_nodes, self.initial_resources_per_node), 2, seed, operations)
+        results = sim.run_independent([make(seed) for seed in (1, 2, 3)], max_workers=2)
+        for seed, result in zip((1, 2, 3), results):
+            serial = make(seed)
+            serial.run()
+            np.testing.assert_array_equal(result.distributions, serial.distributions)
+
+    def test_spawn_seeds(self):
+        seeds = sim.spawn_seeds(42, 3)
+        self.assertEqual(seeds, sim.spawn_seeds(42, 3))
+        self.assertEqual(len(set(seeds)), 3)
+        self.assertNotEqual(seeds, sim.spawn_seeds(43, 3))
+
+    def test_negative_seeds(self):
+        operations = [ResourceDistributionOperation.create('preferential', 50)]
+        def run(seed):
+            multi_step_simulator = sim.MultiStepSimulator(Model(self.initial_nodes, self.initial_resources_per_node), 1, seed, operations)
+            multi_step_simulator.run()
+            return multi_step_simulator.distributions
+        np.testing.assert_array_equal(run(-1), run(-1))
+        self.assertEqual(sim.spawn_seeds(-1, 2), sim.spawn_seeds(-1, 2))
+
+    def test_negative_seed_from_the_command_line(self):
+        args = build_parser().parse_args(['-n', '50', '--preferential-method', '200', '-s', '-1'])
+        simulators = run_simulations_from_args(args)
+        self.assertEqual(simulators[0].seed, -1)
+        self.assertEqual(simulators[0].model.total_resources, 50 * 100 + 200)
 
 if __name__ == '__main__':
     unittest.main()